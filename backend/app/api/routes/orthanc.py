@@ -4,11 +4,13 @@ This demonstrates how to use the Orthanc client throughout the application.
 """
 
 import logging
+import os
+import tempfile
 from typing import Any
 
 import numpy as np
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response
 from pyorthanc import (
     Instance,
     Series,
@@ -17,6 +19,7 @@ from pyorthanc import (
     find_patients,
     find_studies,
 )
+from starlette.background import BackgroundTask
 
 from app.core.carm import CArm, CArmLPSAdapter
 from app.core.config import settings
@@ -27,7 +30,7 @@ from app.core.slicer_parser import SlicerMarkupsMrkJson
 from app.core.vtk_utils import (
     create_vtk_image_from_multiframe,
     create_vtk_image_from_volume,
-    write_vtk_image_to_vti,
+    write_vtk_image_to_vti_file,
 )
 from app.schemas.label import CoronaryArtery
 
@@ -221,6 +224,24 @@ async def get_series_label_content(series_id: str, label_filename: str):
         )
 
 
+def _vti_file_response(vtk_image, headers: dict[str, str]) -> FileResponse:
+    """Stream a VTK image to a temporary VTI file and serve it, deleting it afterwards."""
+    fd, vti_path = tempfile.mkstemp(suffix=".vti")
+    os.close(fd)
+    try:
+        write_vtk_image_to_vti_file(vtk_image, vti_path)
+    except Exception:
+        os.remove(vti_path)
+        raise
+
+    return FileResponse(
+        vti_path,
+        media_type="application/octet-stream",
+        headers=headers,
+        background=BackgroundTask(os.remove, vti_path),
+    )
+
+
 async def _process_volume_data(instances):
     """Process volumetric data (CT, MR, etc.) using VolumeDicomHandler"""
     if not instances:
@@ -237,16 +258,12 @@ async def _process_volume_data(instances):
         ct_handler, center_at_origin=True, column_major=True
     )
 
-    # Write to VTI format
-    vti_data = write_vtk_image_to_vti(vtk_image)
-
     # If window level information is not available in DICOM, calculate optimal values
     window_width, window_center = compute_optimal_window_level(ct_handler.voxel_array)
 
-    # Create response with binary data and window level info
-    return Response(
-        content=vti_data,
-        media_type="application/octet-stream",
+    # Write to VTI format and respond with binary data and window level info
+    return _vti_file_response(
+        vtk_image,
         headers={
             "X-Window-Width": str(window_width),
             "X-Window-Center": str(window_center),
@@ -301,20 +318,14 @@ async def _process_multiframe_data(instances):
     if window_width is None or window_center is None:
         window_width, window_center = compute_optimal_window_level(pixel_array)
 
-    # Write to VTI format
-    vti_data = write_vtk_image_to_vti(vtk_image)
-
     # Include window level info and pixel type info in response headers
     headers = {
         "X-Window-Width": str(window_width),
         "X-Window-Center": str(window_center),
     }
 
-    return Response(
-        content=vti_data,
-        media_type="application/octet-stream",
-        headers=headers,
-    )
+    # Write to VTI format
+    return _vti_file_response(vtk_image, headers)
 
 
 @router.get("/studies/{study_id}/series")
@@ -1,3 +1,4 @@
+import functools
 import math
 import os
 import re
@@ -6,6 +7,9 @@ from pathlib import Path
 import numpy as np
 import pydicom
 from pydicom.dataset import FileDataset
+from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian
+
+from app.core.numba_utils import build_curve
 
 # https://numpy.org/devdocs/reference/arrays.scalars.html#sized-aliases
 DATA_VAL_REPR_MAPPPER = {
@@ -111,15 +115,94 @@ def read_dicom_element_value(dcm, elem_name, type_cast_to=None):
         return value
 
 
+@functools.lru_cache(maxsize=256)
+def _cached_handler(path_str: str, _mtime_ns: int):
+    # `_mtime_ns` is only part of the key, so a rewritten file is re-parsed.
+    return BaseDicomHandler(path_str)
+
+
+UNCOMPRESSED_LITTLE_ENDIAN_SYNTAXES = (ExplicitVRLittleEndian, ImplicitVRLittleEndian)
+
+
+# (7FE0,0010) as it appears in a little-endian file
+PIXEL_DATA_TAG_BYTES = b"\xe0\x7f\x10\x00"
+
+
+def _pixel_data_value_offset(f, dcm):
+    """
+    File offset of the PixelData value of an uncompressed little-endian file.
+
+    `f` must be where `dcmread(f, stop_before_pixels=True)` left it, i.e. at
+    the start of the PixelData element. Returns None for other transfer
+    syntaxes or when PixelData is not there.
+    """
+    file_meta = getattr(dcm, "file_meta", None)
+    if file_meta is None:
+        return None
+    transfer_syntax = file_meta.get("TransferSyntaxUID")
+    if transfer_syntax not in UNCOMPRESSED_LITTLE_ENDIAN_SYNTAXES:
+        return None
+    tag_start = f.tell()
+    if f.read(4) != PIXEL_DATA_TAG_BYTES:
+        return None
+    if transfer_syntax == ImplicitVRLittleEndian:
+        # tag (4) + length (4)
+        return tag_start + 8
+    # tag (4) + VR (2) + reserved (2) + length (4)
+    return tag_start + 12
+
+
 class BaseDicomHandler:
-    def __init__(self, dcm_or_path: Path | str | FileDataset):
+    def __init__(
+        self,
+        dcm_or_path: Path | str | FileDataset,
+        stop_before_pixels: bool = False,
+        defer_size: str | int | None = None,
+    ):
+        """
+        Args:
+            dcm_or_path: DICOM file path or an already parsed dataset
+            stop_before_pixels: If True, PixelData is not read from the file.
+                It is read in full the first time `pixel_array` is accessed,
+                and `pixel_data_offset` records where its value starts.
+            defer_size: Elements larger than this (e.g. "1 KB") are read from
+                the file only when accessed. Only used when a path is given.
+        """
         self.dcm_path = None
+        # File offset of the PixelData value; only known for header-only reads
+        # of uncompressed little-endian files
+        self.pixel_data_offset = None
         if isinstance(dcm_or_path, (Path, str)):
             self.dcm_path = dcm_or_path
-            self.dcm = pydicom.dcmread(dcm_or_path)
+            if stop_before_pixels:
+                with open(dcm_or_path, "rb") as f:
+                    self.dcm = pydicom.dcmread(
+                        f, stop_before_pixels=True, defer_size=defer_size
+                    )
+                    self.pixel_data_offset = _pixel_data_value_offset(f, self.dcm)
+            else:
+                self.dcm = pydicom.dcmread(dcm_or_path, defer_size=defer_size)
         else:
             self.dcm = dcm_or_path
 
+    @classmethod
+    def from_path(cls, dcm_path: Path | str):
+        """
+        Return a shared handler for `dcm_path`, parsing the file only once.
+
+        Handlers are kept in an LRU cache keyed by absolute path (and mtime),
+        so repeated requests for the same file skip `pydicom.dcmread`.
+
+        Notes
+        -----
+        - The returned handler is shared; callers must not mutate `handler.dcm`.
+        - `functools.lru_cache` keeps its own bookkeeping thread-safe, but two
+          threads missing the cache at the same time may both parse the file.
+          Guard calls with a `threading.Lock` if that matters.
+        """
+        path = Path(dcm_path).resolve()
+        return _cached_handler(str(path), os.stat(path).st_mtime_ns)
+
     def __repr__(self):
         return str(self.dcm)
 
@@ -151,6 +234,9 @@ class BaseDicomHandler:
         - IVUS(3-channel), CAG(1-channel)
         - IVUS의 1번째 channel에 촬영 이미지가 있고 2, 3번째 channel에는 눈금자가 그려져있다.
         """
+        if self.dcm_path is not None and "PixelData" not in self.dcm:
+            # Read with `stop_before_pixels=True`
+            self.dcm = pydicom.dcmread(self.dcm_path)
         return self.dcm.pixel_array
 
     @property
@@ -323,38 +409,32 @@ class BaseDicomHandler:
             curve_dims = self.curve_dimensions
             curve_data_descriptor = self.curve_data_descriptor
 
+            ndims_wo_interval = curve_dims
             if curve_data_descriptor is not None:
                 ndims_wo_interval = curve_dims - sum(
                     [i == 0 for i in curve_data_descriptor]
                 )
 
-                if ndims_wo_interval < curve_dims:
-                    if isinstance(self.coordinate_start_value, list):
-                        coord_start_val = self.coordinate_start_value[0]
-                    else:
-                        coord_start_val = self.coordinate_start_value
-
-                    if isinstance(self.coordinate_step_value, list):
-                        coord_step_val = self.coordinate_step_value[0]
-                    else:
-                        coord_step_val = self.coordinate_step_value
-
-                    # dtype=type_to를 넣어줘야 하는데, overflow 일어나는 경우가 있어서 제외.
-                    interval_data = np.array(
-                        [
-                            coord_start_val + coord_step_val * i
-                            for i in range(number_of_pts)
-                        ]
-                    )
-            else:
-                ndims_wo_interval = curve_dims
-                interval_data = None
+            if ndims_wo_interval < curve_dims:
+                if isinstance(self.coordinate_start_value, list):
+                    coord_start_val = self.coordinate_start_value[0]
+                else:
+                    coord_start_val = self.coordinate_start_value
 
-            curve_data = curve_data.reshape(-1, ndims_wo_interval)
-            if interval_data is not None:
-                curve_data = np.concatenate(
-                    [interval_data.reshape(-1, 1), curve_data], axis=-1
+                if isinstance(self.coordinate_step_value, list):
+                    coord_step_val = self.coordinate_step_value[0]
+                else:
+                    coord_step_val = self.coordinate_step_value
+
+                # dtype=type_to를 넣어줘야 하는데, overflow 일어나는 경우가 있어서 float64로 계산.
+                curve_data = build_curve(
+                    curve_data[: number_of_pts * ndims_wo_interval],
+                    ndims_wo_interval,
+                    float(coord_start_val),
+                    float(coord_step_val),
                 )
+            else:
+                curve_data = curve_data.reshape(-1, ndims_wo_interval)
         return curve_data
 
     @property
@@ -570,11 +650,15 @@ class VolumeDicomHandler:
 
     @property
     def image_direction_matrix(self):
+        if "image_direction_matrix" in self.identity_map:
+            return self.identity_map["image_direction_matrix"]
         image_orientation = self.image_orientation_patient
         v_x = np.array(image_orientation[:3])
         v_y = np.array(image_orientation[3:6])
         v_z = np.cross(v_x, v_y)
         rotation_matrix = np.array([v_x, v_y, v_z])
+        rotation_matrix.flags.writeable = False
+        self.identity_map.update({"image_direction_matrix": rotation_matrix})
         return rotation_matrix
 
     @property
@@ -587,20 +671,24 @@ class VolumeDicomHandler:
         ----------
         .. [1] https://stackoverflow.com/questions/14930222/how-to-calculate-space-between-dicom-slices-for-mpr
         """
-        if not isinstance(self.pixel_spacing, list):
-            pixel_spacing = [self.pixel_spacing, self.pixel_spacing]
-        else:
-            pixel_spacing = self.pixel_spacing[::-1]
-        if self.spacing_between_slices is not None:
-            spacing_between_slices = self.spacing_between_slices
+        if "spacing" in self.identity_map:
+            return list(self.identity_map["spacing"])
+        pixel_spacing = self.pixel_spacing
+        if not isinstance(pixel_spacing, list):
+            pixel_spacing = [pixel_spacing, pixel_spacing]
         else:
+            pixel_spacing = pixel_spacing[::-1]
+        spacing_between_slices = self.spacing_between_slices
+        if spacing_between_slices is None:
             first_slice = self.dcm_series[0]
             second_slice = self.dcm_series[1]
             spacing_between_slices = (
                 second_slice.image_position_patient[2]
                 - first_slice.image_position_patient[2]
             )
-        return pixel_spacing + [spacing_between_slices]
+        spacing = pixel_spacing + [spacing_between_slices]
+        self.identity_map.update({"spacing": spacing})
+        return list(spacing)
 
     def load_dicom_series(self):
         """
@@ -612,7 +700,9 @@ class VolumeDicomHandler:
         dcm_path_list = list(self.dcm_dir_path.glob("*.dcm"))
         dcm_series = []
         for dcm_path in dcm_path_list:
-            dcm_series.append(BaseDicomHandler(dcm_path))
+            # Sorting only needs the header; the pixels are read afterwards,
+            # straight from the recorded PixelData offset when possible.
+            dcm_series.append(BaseDicomHandler(dcm_path, stop_before_pixels=True))
         return dcm_series
 
     def _sort_dicom_datasets(self, dicom_datasets):
@@ -662,13 +752,94 @@ class VolumeDicomHandler:
         """
         if "voxel_array" in self.identity_map:
             return self.identity_map["voxel_array"]
-        pixel_array_list = []
-        for dcm in self.dcm_series:
-            pixel_array_list.append(dcm.pixel_array)
-        voxel_array = np.stack(pixel_array_list, axis=0)
+        voxel_array = self._read_uncompressed_voxel_array()
+        if voxel_array is None:
+            # Fill a preallocated C-contiguous (Z, Y, X) array slice by slice,
+            # rather than np.stack-ing a list, which holds two full copies at once.
+            for i, handler in enumerate(self.dcm_series):
+                if handler.dcm_path is not None and "PixelData" not in handler.dcm:
+                    # Read the full slice without keeping it on its header-only
+                    # handler, so the pixels are only held in `voxel_array`
+                    pixel_array = pydicom.dcmread(handler.dcm_path).pixel_array
+                else:
+                    pixel_array = handler.pixel_array
+                if voxel_array is None:
+                    voxel_array = np.empty(
+                        (self.number_of_slices, *pixel_array.shape),
+                        dtype=pixel_array.dtype,
+                    )
+                voxel_array[i] = pixel_array
         self.identity_map.update({"voxel_array": voxel_array})
         return voxel_array
 
+    def drop_pixel_cache(self):
+        """
+        Release the cached voxel array.
+
+        Only frees memory when nothing else references the array: an image
+        from `create_vtk_image_from_volume` shares int16/uint16 voxels rather
+        than copying them. `voxel_array` reloads them if accessed again.
+        """
+        self.identity_map.pop("voxel_array", None)
+
+    def _read_uncompressed_voxel_array(self):
+        """
+        Read 16-bit uncompressed little-endian slices straight into one buffer.
+
+        Each slice's PixelData bytes are copied from its file with `readinto`,
+        at the offset recorded when its header was read, skipping pydicom's
+        pixel decoding. Returns None when the series does not qualify
+        (in-memory datasets, compressed syntaxes, mixed geometry, ...).
+        """
+        ref = self.ref_dcm.dcm
+        rows = ref.get("Rows")
+        cols = ref.get("Columns")
+        pixel_representation = ref.get("PixelRepresentation")
+        if (
+            rows is None
+            or cols is None
+            or ref.get("BitsAllocated") != 16
+            or ref.get("SamplesPerPixel", 1) != 1
+            or int(ref.get("NumberOfFrames", 1) or 1) != 1
+        ):
+            return None
+        if pixel_representation == 1:
+            # Signed data with unused high bits needs pydicom's sign correction.
+            if ref.get("BitsStored") != 16:
+                return None
+            dtype = np.dtype("<i2")
+        elif pixel_representation == 0:
+            dtype = np.dtype("<u2")
+        else:
+            return None
+
+        slice_bytes = rows * cols * dtype.itemsize
+        voxel_array = np.empty((self.number_of_slices, rows, cols), dtype=dtype)
+        buffer = memoryview(voxel_array).cast("B")
+        for i, handler in enumerate(self.dcm_series):
+            dcm = handler.dcm
+            file_meta = getattr(dcm, "file_meta", None)
+            if (
+                handler.dcm_path is None
+                or file_meta is None
+                or file_meta.get("TransferSyntaxUID")
+                not in UNCOMPRESSED_LITTLE_ENDIAN_SYNTAXES
+                or dcm.get("Rows") != rows
+                or dcm.get("Columns") != cols
+                or dcm.get("BitsAllocated") != 16
+                or dcm.get("PixelRepresentation") != pixel_representation
+            ):
+                return None
+            offset = handler.pixel_data_offset
+            if offset is None:
+                return None
+            with open(handler.dcm_path, "rb") as f:
+                f.seek(offset)
+                chunk = buffer[i * slice_bytes : (i + 1) * slice_bytes]
+                if f.readinto(chunk) != slice_bytes:
+                    return None
+        return voxel_array
+
     @property
     def volume_center_position_mm(self):
         """
@@ -721,6 +892,33 @@ class VolumeDicomHandler:
             else:
                 return self.dcm_series[int_part].image_position_patient
 
+    @property
+    def _affine_base(self):
+        """
+        Cached pieces of the voxel to RCS transform.
+
+        Returns:
+            tuple: (M_xy, slice_positions) where M_xy (3x2) maps (x, y) pixel
+                offsets to mm and slice_positions (N x 3) holds every slice's
+                ImagePositionPatient in sorted order.
+        """
+        if "affine_base" in self.identity_map:
+            return self.identity_map["affine_base"]
+        if self.ref_dcm.anatomical_orientation_type == "QUADRUPED":
+            raise NotImplementedError("QUADRUPED is not supported yet")
+
+        pixel_spacing = self.ref_dcm.pixel_spacing
+        image_orientation = np.array(self.ref_dcm.image_orientation_patient)
+        M_xy = np.empty((3, 2), dtype=np.float64)
+        M_xy[:, 0] = image_orientation[:3] * pixel_spacing[1]
+        M_xy[:, 1] = image_orientation[3:] * pixel_spacing[0]
+        slice_positions = np.array(
+            [dcm.image_position_patient for dcm in self.dcm_series], dtype=np.float64
+        )
+        affine_base = (M_xy, slice_positions)
+        self.identity_map.update({"affine_base": affine_base})
+        return affine_base
+
     def voxel_to_rcs_coordinate(self, voxel_coordinate):
         """
         See Equation C.7.6.2.1-1.
@@ -732,22 +930,23 @@ class VolumeDicomHandler:
         .. [1] https://dicom.nema.org/medical/dicom/current/output/chtml/part03/sect_C.7.6.2.html#sect_C.7.6.2.1.1
         .. [2] https://blog.redbrickai.com/blog-posts/introduction-to-dicom-coordinate
         """
-        if self.ref_dcm.anatomical_orientation_type == "QUADRUPED":
-            raise NotImplementedError("QUADRUPED is not supported yet")
+        return self.voxel_to_rcs_coordinate_many(np.array([voxel_coordinate]))[0]
 
-        x, y, z = voxel_coordinate
+    def voxel_to_rcs_coordinate_many(self, voxel_coordinates: np.ndarray):
+        """
+        Vectorized `voxel_to_rcs_coordinate` for an (N, 3) array of (x, y, z) voxels.
 
-        pixel_spacing = self.ref_dcm.pixel_spacing
-        image_orientation = np.array(self.ref_dcm.image_orientation_patient)
-        image_position = np.array(self.get_image_position_patient(z))  # [S_x, S_y, S_z]
+        Fractional z is linearly interpolated between neighbouring slice positions,
+        same as `get_image_position_patient`.
+        """
+        M_xy, slice_positions = self._affine_base
+        voxel_coordinates = np.asarray(voxel_coordinates, dtype=np.float64)
 
-        M = np.stack(
-            [
-                image_orientation[:3] * pixel_spacing[1],
-                image_orientation[3:] * pixel_spacing[0],
-                np.zeros((3,)),
-                image_position,
-            ],
-            axis=-1,
-        )
-        return (M @ np.array([[x, y, 0, 1]]).T).T[0]
+        z = voxel_coordinates[:, 2]
+        z_lower = np.floor(z).astype(np.intp)
+        z_upper = np.minimum(z_lower + 1, len(slice_positions) - 1)
+        frac = (z - z_lower)[:, None]
+        image_position = slice_positions[z_lower] + frac * (
+            slice_positions[z_upper] - slice_positions[z_lower]
+        )  # [S_x, S_y, S_z]
+        return voxel_coordinates[:, :2] @ M_xy.T + image_position
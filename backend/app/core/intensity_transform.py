@@ -1,5 +1,7 @@
 import numpy as np
 
+from app.core.numba_utils import uint16_histogram
+
 
 def compute_optimal_window_level(voxel_array: np.ndarray):
     """
@@ -31,3 +33,64 @@ def compute_optimal_window_level(voxel_array: np.ndarray):
     width = max_val - min_val
     center = (max_val + min_val) / 2.0
     return width, center
+
+
+def compute_percentile_window(
+    values: np.ndarray, low: float = 1.0, high: float = 99.0
+) -> tuple[float, float]:
+    """
+    Window spanning the `low` and `high` percentiles of `values`.
+
+    uint16 data (the layout VTK images are stored in) is ranked from a
+    one-pass histogram instead of being sorted, as `np.percentile` does. The
+    percentiles are the lower nearest-rank values, so they are always values
+    present in the data.
+
+    Args:
+        values: Voxel data
+        low: Lower percentile, in [0, 100]
+        high: Upper percentile, in [0, 100]
+
+    Returns:
+        tuple: (window_width, window_center)
+    """
+    values = np.ravel(values)
+    if values.dtype != np.uint16:
+        min_val, max_val = np.percentile(values, [low, high], method="lower")
+    else:
+        cdf = np.cumsum(uint16_histogram(values))
+        ranks = np.floor(np.array([low, high]) / 100.0 * (values.size - 1))
+        min_val, max_val = np.searchsorted(cdf, ranks, side="right")
+
+    min_val, max_val = float(min_val), float(max_val)
+    return max_val - min_val, (max_val + min_val) / 2.0
+
+
+def quantize_for_window(
+    voxel_array: np.ndarray, window_width: float, window_center: float
+) -> np.ndarray:
+    """
+    Apply a window/level to voxel data and quantize it to 8 bits.
+
+    Useful when the display window is fixed: the result is half the size of
+    16-bit data and compresses much better.
+
+    Args:
+        voxel_array: A numpy array containing voxel data
+        window_width: Range of intensity values to display. Widths below 1
+            (e.g. 0 for a constant volume) are treated as 1.
+        window_center: Center point of the intensity window
+
+    Returns:
+        np.ndarray: uint8 array of the same shape, 0 at the window's lower
+            bound and 255 at its upper bound
+    """
+    window_width = max(window_width, 1.0)
+    lut_min = window_center - window_width / 2.0
+    scale = 255.0 / window_width
+
+    scaled = np.subtract(voxel_array, lut_min, dtype=np.float32)
+    scaled *= scale
+    out = np.empty(voxel_array.shape, dtype=np.uint8)
+    np.clip(scaled, 0, 255, out=out, casting="unsafe")
+    return out
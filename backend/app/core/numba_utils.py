@@ -0,0 +1,146 @@
+"""
+Numba kernels for volume processing.
+
+numba is optional: every public function here falls back to plain NumPy when it
+cannot be imported, so callers never need to check for it themselves.
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+if numba is not None:
+
+    @numba.njit(parallel=True, cache=True)
+    def _count_per_slab(vol, mask_value):
+        counts = np.zeros(vol.shape[0], dtype=np.int64)
+        for a in numba.prange(vol.shape[0]):
+            count = 0
+            for b in range(vol.shape[1]):
+                for c in range(vol.shape[2]):
+                    if vol[a, b, c] == mask_value:
+                        count += 1
+            counts[a] = count
+        return counts
+
+    @numba.njit(parallel=True, cache=True)
+    def _fill_coords(vol, mask_value, offsets, out):
+        for a in numba.prange(vol.shape[0]):
+            n = offsets[a]
+            for b in range(vol.shape[1]):
+                for c in range(vol.shape[2]):
+                    if vol[a, b, c] == mask_value:
+                        out[n, 0] = a
+                        out[n, 1] = b
+                        out[n, 2] = c
+                        n += 1
+
+    @numba.njit(cache=True)
+    def _build_curve(values, n_dims, start, step):
+        n_pts = values.shape[0] // n_dims
+        curve = np.empty((n_pts, n_dims + 1), dtype=np.float64)
+        for i in range(n_pts):
+            curve[i, 0] = start + step * i
+            for j in range(n_dims):
+                curve[i, j + 1] = values[i * n_dims + j]
+        return curve
+
+    @numba.njit(parallel=True, cache=True)
+    def _uint16_histogram(values, n_chunks):
+        # One private histogram per chunk, so the parallel loop needs no atomics
+        partial = np.zeros((n_chunks, 65536), dtype=np.int64)
+        chunk_size = (values.size + n_chunks - 1) // n_chunks
+        for t in numba.prange(n_chunks):
+            start = t * chunk_size
+            stop = min(start + chunk_size, values.size)
+            for i in range(start, stop):
+                partial[t, values[i]] += 1
+        hist = np.zeros(65536, dtype=np.int64)
+        for b in numba.prange(65536):
+            total = 0
+            for t in range(n_chunks):
+                total += partial[t, b]
+            hist[b] = total
+        return hist
+
+
+def build_curve(
+    values: np.ndarray, n_dims: int, start: float, step: float
+) -> np.ndarray:
+    """
+    Interleaved curve samples with an evenly spaced leading coordinate.
+
+    Args:
+        values: 1D samples, `n_dims` values per point
+        n_dims: Number of values per point
+        start: Coordinate of the first point
+        step: Coordinate step between points
+
+    Returns:
+        np.ndarray: (N, n_dims + 1) float64 array of [coordinate, values...]
+    """
+    if numba is not None:
+        return _build_curve(values, n_dims, start, step)
+
+    values = values.reshape(-1, n_dims)
+    curve = np.empty((values.shape[0], n_dims + 1), dtype=np.float64)
+    curve[:, 0] = start + step * np.arange(values.shape[0], dtype=np.float64)
+    curve[:, 1:] = values
+    return curve
+
+
+def uint16_histogram(values: np.ndarray) -> np.ndarray:
+    """
+    Histogram of uint16 values with one bin per value, like
+    `np.bincount(values, minlength=65536)`.
+
+    Args:
+        values: uint16 array of any shape
+
+    Returns:
+        np.ndarray: (65536,) int64 counts
+    """
+    values = np.ravel(values)
+    if numba is None:
+        return np.bincount(values, minlength=65536)
+    return _uint16_histogram(values, numba.get_num_threads())
+
+
+def mask_to_coords(vol: np.ndarray, mask_value) -> np.ndarray:
+    """
+    Indices of the voxels equal to `mask_value`, like `np.argwhere(vol == mask_value)`.
+
+    With numba, the volume is scanned slab by slab in parallel without building
+    a boolean mask: one pass counts matches per slab, the prefix sum of the
+    counts gives each slab its output range, and a second pass writes the
+    indices. Rows are ordered by memory layout, so for Fortran-ordered volumes
+    (e.g. `nrrd.read`) the last axis varies slowest.
+
+    Args:
+        vol: 3D volume
+        mask_value: Value to search for
+
+    Returns:
+        np.ndarray: (N, 3) int64 voxel indices
+    """
+    if numba is None or vol.ndim != 3:
+        return np.argwhere(vol == mask_value)
+
+    vol = np.asarray(vol)
+    transposed = not vol.flags.c_contiguous and vol.flags.f_contiguous
+    if transposed:
+        vol = vol.T
+
+    counts = _count_per_slab(vol, mask_value)
+    offsets = np.zeros_like(counts)
+    np.cumsum(counts[:-1], out=offsets[1:])
+    coords = np.empty((int(counts.sum()), 3), dtype=np.int64)
+    _fill_coords(vol, mask_value, offsets, coords)
+
+    if transposed:
+        coords = coords[:, ::-1]
+    return coords
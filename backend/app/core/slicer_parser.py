@@ -1,71 +1,264 @@
-import json
+from functools import cached_property
+from itertools import chain
+from pathlib import Path
 
 import nrrd
 import numpy as np
 
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
 from .coordinate import CoordinateSystem, TransformationMatrix
+from .numba_utils import mask_to_coords
+
+_EYE4 = np.eye(4)
+
+# NRRD "space" field values, full and abbreviated
+NRRD_SPACE_TO_COORDINATE_SYSTEM = {
+    "left-posterior-superior": CoordinateSystem.LPS,
+    "right-anterior-superior": CoordinateSystem.RAS,
+    "LPS": CoordinateSystem.LPS,
+    "RAS": CoordinateSystem.RAS,
+}
+
+# NRRD "type" field values (with their aliases) to numpy type codes
+NRRD_TYPE_TO_DTYPE = {
+    **dict.fromkeys(["signed char", "int8", "int8_t"], "i1"),
+    **dict.fromkeys(["uchar", "unsigned char", "uint8", "uint8_t"], "u1"),
+    **dict.fromkeys(
+        ["short", "short int", "signed short", "signed short int", "int16", "int16_t"],
+        "i2",
+    ),
+    **dict.fromkeys(
+        ["ushort", "unsigned short", "unsigned short int", "uint16", "uint16_t"], "u2"
+    ),
+    **dict.fromkeys(["int", "signed int", "int32", "int32_t"], "i4"),
+    **dict.fromkeys(["uint", "unsigned int", "uint32", "uint32_t"], "u4"),
+    **dict.fromkeys(
+        [
+            "longlong",
+            "long long",
+            "long long int",
+            "signed long long",
+            "signed long long int",
+            "int64",
+            "int64_t",
+        ],
+        "i8",
+    ),
+    **dict.fromkeys(
+        [
+            "ulonglong",
+            "unsigned long long",
+            "unsigned long long int",
+            "uint64",
+            "uint64_t",
+        ],
+        "u8",
+    ),
+    "float": "f4",
+    "double": "f8",
+}
+
+
+def _nrrd_dtype(header) -> np.dtype | None:
+    """numpy dtype of the data described by a NRRD header, or None if unsupported"""
+    type_code = NRRD_TYPE_TO_DTYPE.get(header.get("type"))
+    if type_code is None:
+        return None
+    dtype = np.dtype(type_code)
+    if dtype.itemsize > 1:
+        dtype = dtype.newbyteorder("<" if header.get("endian") != "big" else ">")
+    return dtype
 
 
 class SlicerSegmentationNrrd:
     def __init__(self, file_path: str):
-        self.data, self.header = nrrd.read(file_path)
+        self.file_path = file_path
+        self.header = nrrd.read_header(str(file_path))
+        self._data = None
+        # The header never changes for a file, so convert it once.
+        self._direction = np.ascontiguousarray(
+            self.header["space directions"], dtype=np.float64
+        )
+        self._origin = np.asarray(self.header["space origin"], dtype=np.float64)
+        self._coordinate_system = NRRD_SPACE_TO_COORDINATE_SYSTEM[self.header["space"]]
+
+        # Compose space directions with the change to LPS once, so that a point
+        # cloud is `ijk @ self._to_lps.T + self._origin_lps` whatever the space.
+        to_lps = TransformationMatrix.get_coordinate_transform_matrix(
+            self._coordinate_system, CoordinateSystem.LPS
+        )
+        self._to_lps = to_lps @ self._direction
+        self._origin_lps = to_lps @ self._origin
+        self._affine_cache = {}
+        self._affine(np.float32)
+
+    @property
+    def data(self):
+        """
+        Label volume, loaded on first access.
+
+        Raw-encoded files are memory-mapped so that label queries only touch the
+        pages they scan; compressed files are read fully with `nrrd.read`.
+        """
+        if self._data is None:
+            self._data = self._memmap_data()
+            if self._data is None:
+                self._data, _ = nrrd.read(str(self.file_path))
+        return self._data
+
+    def _memmap_data(self):
+        header = self.header
+        dtype = _nrrd_dtype(header)
+        if dtype is None or header.get("encoding") != "raw" or "line skip" in header:
+            return None
+        byte_skip = header.get("byte skip", 0)
+        if byte_skip < 0:
+            return None
+
+        data_file = header.get("data file", header.get("datafile"))
+        if data_file is not None:
+            if data_file.startswith("LIST") or "%" in data_file:
+                return None
+            data_path = Path(self.file_path).parent / data_file
+            offset = byte_skip
+        else:
+            # Attached data starts right after the blank line ending the header.
+            data_path = Path(self.file_path)
+            with open(data_path, "rb") as f:
+                for line in iter(f.readline, b""):
+                    if not line.strip():
+                        break
+                offset = f.tell() + byte_skip
+
+        # Same (i, j, k) indexing as `nrrd.read`'s default Fortran index order.
+        return np.memmap(
+            data_path,
+            dtype=dtype,
+            mode="r",
+            offset=offset,
+            shape=tuple(header["sizes"]),
+            order="F",
+        )
 
     @property
     def coordinate_system(self):
-        return CoordinateSystem[self.header["space"]]
+        return self._coordinate_system
 
     @property
     def direction(self):
-        return self.header["space directions"]
+        return self._direction
 
     @property
     def origin(self):
-        return self.header["space origin"]
+        return self._origin
 
-    def get_point_cloud(self, mask_value: int):
-        coords = np.stack(np.where(self.data == mask_value), axis=-1)
-        coords = (self.direction @ coords.T).T + self.origin
-        if self.coordinate_system == CoordinateSystem.LPS:
-            return coords
-        else:
-            return TransformationMatrix.get_coordinate_transform_matrix(
-                self.coordinate_system, CoordinateSystem.LPS
+    def _affine(self, dtype):
+        """Index to LPS transform as (pre-transposed matrix, origin), cast to `dtype`."""
+        dtype = np.dtype(dtype)
+        if dtype not in self._affine_cache:
+            self._affine_cache[dtype] = (
+                np.ascontiguousarray(self._to_lps.T, dtype=dtype),
+                self._origin_lps.astype(dtype),
             )
+        return self._affine_cache[dtype]
+
+    def get_point_cloud(self, mask_value: int, dtype=np.float32):
+        """
+        Args:
+            mask_value: Label value to extract
+            dtype: Floating point type of the returned coordinates. float32 halves
+                the memory of large clouds; pass np.float64 if more precision is needed.
+
+        Returns:
+            np.ndarray: (N, 3) points in LPS
+        """
+        direction_T, origin = self._affine(dtype)
+        coords = mask_to_coords(self.data, mask_value).astype(dtype, copy=False)
+        return coords @ direction_T + origin
 
 
 class SlicerMarkupsMrkJson:
     def __init__(self, file_path: str):
-        with open(file_path, "r") as f:
-            self.data = json.load(f)
+        with open(file_path, "rb") as f:
+            self.data = _json.loads(f.read())
+        self._coordinate_system = CoordinateSystem[
+            self.data["markups"][0]["coordinateSystem"]
+        ]
         assert self.coordinate_system == CoordinateSystem.LPS
 
     @property
     def coordinate_system(self):
-        return CoordinateSystem[self.data["markups"][0]["coordinateSystem"]]
+        return self._coordinate_system
 
     @property
     def coordinate_units(self):
         return self.data["markups"][0]["coordinateUnits"]
 
+    @cached_property
+    def positions(self):
+        """(N, 3) control point positions, parsed on first access. Read-only."""
+        markups = self.data["markups"][0]
+        if "controlPoints" not in markups:
+            return None
+        control_points = markups["controlPoints"]
+        n_points = len(control_points)
+        positions = np.fromiter(
+            chain.from_iterable(cp["position"] for cp in control_points),
+            dtype=np.float64,
+            count=3 * n_points,
+        ).reshape(n_points, 3)
+        positions.flags.writeable = False
+        return positions
+
+    @cached_property
+    def orientations(self):
+        """(N, 4, 4) control point orientations, parsed on first access. Read-only."""
+        markups = self.data["markups"][0]
+        if "controlPoints" not in markups:
+            return None
+        control_points = markups["controlPoints"]
+        n_points = len(control_points)
+        # 3x3 to 4x4
+        orientations = np.tile(_EYE4, (n_points, 1, 1))
+        orientations[:, :3, :3] = np.fromiter(
+            chain.from_iterable(cp["orientation"] for cp in control_points),
+            dtype=np.float64,
+            count=9 * n_points,
+        ).reshape(n_points, 3, 3)
+        orientations.flags.writeable = False
+        return orientations
+
     @property
     def control_points(self):
+        return self.get_control_points(with_orientation=True)
+
+    def get_control_points(self, with_orientation: bool = True):
         """
         position은 coordinateSystem에 맞는 값으로 나오고, orientation은 RAS로 가기 위한 값으로 보인다.
 
+        Orientations are only parsed when requested, see `positions` and `orientations`.
+
+        Args:
+            with_orientation: If False, only the positions are returned
+
+        Returns:
+            dict with "position" (N, 3) and "orientation" (N, 4, 4), or the (N, 3)
+            positions alone if `with_orientation` is False. Either way the arrays
+            are copies that the caller may modify.
+
         Reference
         ---------
         .. [1] https://raw.githubusercontent.com/slicer/slicer/master/Modules/Loadable/Markups/Resources/Schema/markups-schema-v1.0.3.json#
         """
-        markups = self.data["markups"][0]
-        if "controlPoints" in markups:
-            positions = []
-            orientations = []
-            for i in markups["controlPoints"]:
-                positions.append(i["position"])
-                # 3x3 to 4x4
-                orientation = np.eye(4)
-                orientation[:3, :3] = np.array(i["orientation"]).reshape(3, 3)
-                orientations.append(orientation)
-            positions = np.stack(positions, axis=0)
-            orientations = np.stack(orientations, axis=0)
-            return {"position": positions, "orientation": orientations}
+        if self.positions is None:
+            return None
+        if not with_orientation:
+            return self.positions.copy()
+        return {
+            "position": self.positions.copy(),
+            "orientation": self.orientations.copy(),
+        }
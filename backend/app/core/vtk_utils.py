@@ -9,36 +9,73 @@ These utilities are shared between frontend and backend code to maintain consist
 behavior and reduce duplication.
 """
 
+from collections import OrderedDict
+from pathlib import Path
+from typing import Literal
+
 import numpy as np
 import vtk
 from vtkmodules.util import numpy_support
 
 from app.core.carm import CArmLPSAdapter
 from app.core.dicom import BaseDicomHandler, VolumeDicomHandler
+from app.core.intensity_transform import compute_percentile_window, quantize_for_window
 
 
 def rotation_matrix_to_vtk_direction_matrix(
     rotation_matrix: np.ndarray,
     column_major: bool = False,
+    out: vtk.vtkMatrix3x3 | None = None,
 ) -> vtk.vtkMatrix3x3:
-    direction_matrix = vtk.vtkMatrix3x3()
-    if column_major:
-        # vtk.js
-        for i in range(3):
-            for j in range(3):
-                direction_matrix.SetElement(i, j, rotation_matrix[j][i])
-    else:
-        # vtk
-        for i in range(3):
-            for j in range(3):
-                direction_matrix.SetElement(i, j, rotation_matrix[i][j])
+    """
+    Convert a 3x3 rotation matrix to a vtkMatrix3x3
+
+    Args:
+        rotation_matrix: 3x3 rotation matrix
+        column_major: If True, stores the transpose (vtk.js convention)
+        out: Optional caller-owned matrix to fill instead of allocating a new one.
+            vtkImageData.SetDirectionMatrix keeps a reference rather than a copy,
+            so do not share one `out` between images that are alive together.
+
+    Returns:
+        The filled direction matrix (`out` if given)
+    """
+    rotation_matrix = np.asarray(rotation_matrix)
+    # vtk.js is column-major; .T is a strided view, copied once below
+    M = rotation_matrix.T if column_major else rotation_matrix
+    flat = np.ascontiguousarray(M, dtype=np.float64).ravel()
+    direction_matrix = out if out is not None else vtk.vtkMatrix3x3()
+    # One wrapped call taking `const double[9]`, instead of 9 SetElement calls
+    direction_matrix.DeepCopy(flat.tolist())
     return direction_matrix
 
 
+def _clip_to_uint16(array: np.ndarray) -> np.ndarray:
+    """Clip `array` to [0, 65535] and cast to uint16 in a single pass."""
+    if np.can_cast(array.dtype, np.uint16, casting="safe"):
+        # e.g. uint8 XA frames: nothing to clip, a plain widening copy
+        return np.ascontiguousarray(array, dtype=np.uint16)
+    out = np.empty(array.shape, dtype=np.uint16)
+    np.clip(array, 0, 65535, out=out, casting="unsafe")
+    return out
+
+
+def _as_uint16_view(array: np.ndarray) -> np.ndarray:
+    """
+    Flat uint16 view of int16/uint16 data, without copying contiguous input.
+
+    int16 is reinterpreted rather than converted; the bits are the same as the
+    wrap-around `astype(np.uint16)` numpy_to_vtk would otherwise do (with a
+    forced deep copy) for a VTK_UNSIGNED_SHORT array.
+    """
+    return np.ascontiguousarray(array).ravel().view(np.uint16)
+
+
 def create_vtk_image_from_volume(
     ct_handler: VolumeDicomHandler,
     center_at_origin: bool = False,
     column_major: bool = False,
+    window: tuple[float, float] | None = None,
 ) -> vtk.vtkImageData:
     """
     Create a VTK image from volume DICOM data (CT, MR, etc.)
@@ -47,11 +84,14 @@ def create_vtk_image_from_volume(
         ct_handler: The volume DICOM handler with the dataset
         center_at_origin: If True, centers the volume at world origin (0,0,0)
         column_major: If True, uses column-major order for the direction matrix
+        window: Optional (window_width, window_center). If given, the window is
+            applied up front and the image is stored as unsigned char.
 
     Returns:
         VTK image data object
     """
-    # Get dimension and spacing information
+    # Get dimension and spacing information (read once; spacing and direction
+    # are cached on the handler)
     dimensions = [
         ct_handler.columns,
         ct_handler.rows,
@@ -74,13 +114,21 @@ def create_vtk_image_from_volume(
     )
 
     # Convert numpy array to VTK array
-    if volume.dtype != np.uint16 and volume.dtype != np.int16:
-        volume_flat = volume.flatten().astype(np.uint16)
+    wrapped_signed = False
+    if window is not None:
+        volume_flat = quantize_for_window(volume, *window).ravel()
+        array_type = vtk.VTK_UNSIGNED_CHAR
+    elif volume.dtype != np.uint16 and volume.dtype != np.int16:
+        volume_flat = _clip_to_uint16(volume).ravel()
+        array_type = vtk.VTK_UNSIGNED_SHORT
     else:
-        volume_flat = volume.flatten()
+        volume_flat = _as_uint16_view(volume)
+        array_type = vtk.VTK_UNSIGNED_SHORT
+        # Negative int16 values wrap to the top of the uint16 range
+        wrapped_signed = volume.dtype == np.int16
 
     vtk_array = numpy_support.numpy_to_vtk(
-        volume_flat, deep=True, array_type=vtk.VTK_UNSIGNED_SHORT
+        volume_flat, deep=False, array_type=array_type
     )
 
     # Create VTK image data
@@ -90,6 +138,9 @@ def create_vtk_image_from_volume(
     image_data.SetOrigin(origin)
     image_data.SetDirectionMatrix(direction_matrix)
     image_data.GetPointData().SetScalars(vtk_array)
+    # VTK reads the scalars straight from the numpy buffer (deep=False)
+    image_data._numpy_reference = volume_flat
+    image_data._wrapped_signed = wrapped_signed
 
     return image_data
 
@@ -130,12 +181,14 @@ def create_vtk_image_from_multiframe(
 
     # Convert numpy array to VTK array
     if frames.dtype != np.uint16 and frames.dtype != np.int16:
-        volume_flat = frames.reshape(-1).astype(np.uint16)
+        volume_flat = _clip_to_uint16(frames).ravel()
     else:
-        volume_flat = frames.reshape(-1)
+        volume_flat = _as_uint16_view(frames)
+    # Negative int16 values wrap to the top of the uint16 range
+    wrapped_signed = frames.dtype == np.int16
 
     vtk_array = numpy_support.numpy_to_vtk(
-        volume_flat, deep=True, array_type=vtk.VTK_UNSIGNED_SHORT
+        volume_flat, deep=False, array_type=vtk.VTK_UNSIGNED_SHORT
     )
 
     # Create VTK image data
@@ -145,31 +198,301 @@ def create_vtk_image_from_multiframe(
     image_data.SetOrigin(origin)
     image_data.SetDirectionMatrix(direction_matrix)
     image_data.GetPointData().SetScalars(vtk_array)
+    # VTK reads the scalars straight from the numpy buffer (deep=False)
+    image_data._numpy_reference = volume_flat
+    image_data._wrapped_signed = wrapped_signed
 
     return image_data
 
 
-def write_vtk_image_to_vti(vtk_image: vtk.vtkImageData) -> bytes:
+def _shared_scalar_buffer(image_data: vtk.vtkImageData) -> np.ndarray | None:
     """
-    Write VTK image data to VTI format as bytes
+    The non-empty numpy buffer VTK reads the image's scalars from, if any.
+
+    Only returned when its dtype matches the VTK scalar type, i.e. when its
+    values are the ones VTK displays.
+    """
+    array = getattr(image_data, "_numpy_reference", None)
+    if (
+        array is None
+        or array.size == 0
+        or numpy_support.get_vtk_array_type(array.dtype) != image_data.GetScalarType()
+    ):
+        return None
+    return array
+
+
+def get_scalar_range(image_data: vtk.vtkImageData) -> tuple[float, float]:
+    """
+    Scalar (min, max) of an image, computed once and cached on the image.
+
+    Uses NumPy on the buffer shared with VTK when there is one, which is faster
+    than VTK's scalar range scan.
+    """
+    scalar_range = getattr(image_data, "_scalar_range", None)
+    if scalar_range is None:
+        array = _shared_scalar_buffer(image_data)
+        if array is not None:
+            scalar_range = (float(array.min()), float(array.max()))
+        else:
+            scalar_range = image_data.GetScalarRange()
+        image_data._scalar_range = scalar_range
+    return scalar_range
+
+
+def _default_window(
+    image_data: vtk.vtkImageData,
+) -> tuple[float, float, tuple[float, float] | None]:
+    """
+    Display window for an image without a DICOM window.
+
+    Uses the 1st-99th percentile of the voxels, or the full data range when
+    the image has no shared numpy buffer or stores int16 data as uint16 (the
+    wrapped negative values would stretch the percentiles over the whole
+    uint16 range).
+
+    Returns:
+        tuple: (window_width, window_center, scalar_range), where scalar_range
+            is None unless the min/max fallback was used
+    """
+    array = _shared_scalar_buffer(image_data)
+    if array is not None and not getattr(image_data, "_wrapped_signed", False):
+        window_width, window_center = compute_percentile_window(array)
+        return window_width, window_center, None
+
+    scalar_range = get_scalar_range(image_data)
+    window_width = scalar_range[1] - scalar_range[0]
+    window_center = (scalar_range[1] + scalar_range[0]) / 2.0
+    return window_width, window_center, scalar_range
+
+
+def _create_plane_mapper(
+    image_data: vtk.vtkImageData, axis: int, center_index: tuple[int, int, int]
+) -> vtk.vtkImageResliceMapper:
+    """Reslice mapper cutting `image_data` normal to index `axis` at `center_index`"""
+    direction_matrix = image_data.GetDirectionMatrix()
+    normal = [direction_matrix.GetElement(row, axis) for row in range(3)]
+    origin = [0.0, 0.0, 0.0]
+    image_data.TransformIndexToPhysicalPoint(*center_index, origin)
+
+    plane = vtk.vtkPlane()
+    plane.SetOrigin(origin)
+    plane.SetNormal(normal)
+
+    mapper = vtk.vtkImageResliceMapper()
+    mapper.SetInputData(image_data)
+    mapper.SliceFacesCameraOff()
+    mapper.SliceAtFocalPointOff()
+    mapper.SetSlicePlane(plane)
+    return mapper
+
+
+def _create_image_slice(mapper: vtk.vtkImageResliceMapper) -> vtk.vtkImageSlice:
+    image_slice = vtk.vtkImageSlice()
+    image_slice.SetMapper(mapper)
+    return image_slice
+
+
+# Orthogonal views of recently used images, keyed by id(image_data), in LRU
+# order. Entries keep the image alive so its id cannot be reused while cached.
+MULTI_SLICE_VIEW_CACHE_SIZE = 4
+_MULTI_SLICE_VIEW_CACHE: OrderedDict[int, tuple[vtk.vtkImageData, dict]] = OrderedDict()
+
+
+def create_multi_slice_image_mapper(
+    image_data: vtk.vtkImageData,
+    window_width: float | None = None,
+    window_center: float | None = None,
+) -> dict:
+    """
+    Create a multi-slice image mapper and actors for orthogonal views (axial, coronal, sagittal)
 
     Args:
-        vtk_image: The VTK image data to write
+        image_data: VTK image data
+        window_width: Optional window width from DICOM
+        window_center: Optional window center from DICOM
+
+    Without a DICOM window, the window spans the 1st-99th percentile of the
+    voxels. Images storing int16 data as uint16 (the usual case for signed CT)
+    use their full min/max range instead, since negative values wrap to the
+    top of the uint16 range.
 
     Returns:
-        The VTI data as bytes
+        dict: Dictionary containing mappers, actors, and extent information.
+            "scalar_range" is only set when the window falls back to the
+            image's min/max; otherwise that full-volume scan is skipped.
+    """
+    # Repeated calls for the same image (e.g. UI refreshes) reuse its views
+    cached = _MULTI_SLICE_VIEW_CACHE.get(id(image_data))
+    if cached is not None:
+        _MULTI_SLICE_VIEW_CACHE.move_to_end(id(image_data))
+        views = cached[1]
+    else:
+        # Get the extent of the volume
+        extent = image_data.GetExtent()
+
+        # Calculate center slices for better initial view
+        center_i = (extent[1] - extent[0]) // 2
+        center_j = (extent[3] - extent[2]) // 2
+        center_k = (extent[5] - extent[4]) // 2
+
+        # Create a reslice mapper and slice actor for each orthogonal view.
+        # The mappers share one input and cut it with a fixed plane through the
+        # center voxel, so only each plane's 2D slice is sent to the GPU.
+        center_index = (center_i, center_j, center_k)
+        # For I plane (YZ), J plane (XZ) and K plane (XY)
+        mappers = [
+            _create_plane_mapper(image_data, axis, center_index) for axis in range(3)
+        ]
+        views = {
+            "mappers": mappers,
+            "actors": [_create_image_slice(mapper) for mapper in mappers],
+            "extent": extent,
+            "center_slices": {"i": center_i, "j": center_j, "k": center_k},
+        }
+        _MULTI_SLICE_VIEW_CACHE[id(image_data)] = (image_data, views)
+        if len(_MULTI_SLICE_VIEW_CACHE) > MULTI_SLICE_VIEW_CACHE_SIZE:
+            _MULTI_SLICE_VIEW_CACHE.popitem(last=False)
+
+    # Set initial window/level settings
+    scalar_range = None
+    if window_width is None or window_center is None:
+        window_width, window_center, scalar_range = _default_window(image_data)
+
+    # Apply window/level settings to all actors
+    for actor in views["actors"]:
+        actor.GetProperty().SetColorLevel(window_center)
+        actor.GetProperty().SetColorWindow(window_width)
+
+    return {
+        **views,
+        "scalar_range": scalar_range,
+        "window_width": window_width,
+        "window_center": window_center,
+    }
+
+
+def create_volume_rendering_actor(
+    image_data: vtk.vtkImageData,
+    window_width: float | None = None,
+    window_center: float | None = None,
+) -> vtk.vtkVolume:
+    """
+    Create a volume rendering actor for a 3D image
+
+    The mapper takes `image_data` as its input directly, so the volume shares
+    the voxel buffer already used by the slice views instead of a copy.
+
+    Args:
+        image_data: VTK image data
+        window_width: Optional window width from DICOM
+        window_center: Optional window center from DICOM
+
+    Returns:
+        vtk.vtkVolume: Volume actor with a grayscale ramp over the window
     """
+    if window_width is None or window_center is None:
+        window_width, window_center, _ = _default_window(image_data)
+    lower = window_center - window_width / 2.0
+    upper = window_center + window_width / 2.0
+
+    mapper = vtk.vtkSmartVolumeMapper()
+    mapper.SetInputData(image_data)
+
+    color = vtk.vtkColorTransferFunction()
+    color.AddRGBPoint(lower, 0.0, 0.0, 0.0)
+    color.AddRGBPoint(upper, 1.0, 1.0, 1.0)
+
+    opacity = vtk.vtkPiecewiseFunction()
+    opacity.AddPoint(lower, 0.0)
+    opacity.AddPoint(upper, 1.0)
+
+    volume_property = vtk.vtkVolumeProperty()
+    volume_property.SetColor(color)
+    volume_property.SetScalarOpacity(opacity)
+    volume_property.SetInterpolationTypeToLinear()
+
+    volume = vtk.vtkVolume()
+    volume.SetMapper(mapper)
+    volume.SetProperty(volume_property)
+    return volume
+
+
+def _create_vti_writer(
+    vtk_image: vtk.vtkImageData,
+    compressor: Literal["zlib", "lz4", "none"],
+    compression_level: int,
+) -> vtk.vtkXMLImageDataWriter:
     writer = vtk.vtkXMLImageDataWriter()
     writer.SetInputData(vtk_image)
     writer.SetDataModeToBinary()
-    writer.SetCompressorTypeToZLib()
+    if compressor == "zlib":
+        writer.SetCompressorTypeToZLib()
+    elif compressor == "lz4":
+        writer.SetCompressorTypeToLZ4()
+    elif compressor == "none":
+        writer.SetCompressorTypeToNone()
+    else:
+        raise ValueError(f"Unsupported compressor: {compressor}")
+    if compressor != "none":
+        writer.SetCompressionLevel(compression_level)
+    return writer
+
+
+def write_vtk_image_to_vti(
+    vtk_image: vtk.vtkImageData,
+    compressor: Literal["zlib", "lz4", "none"] = "zlib",
+    compression_level: int = 1,
+) -> bytes:
+    """
+    Write VTK image data to VTI format as bytes
+
+    Args:
+        vtk_image: The VTK image data to write
+        compressor: Compression codec. vtk.js can only inflate "zlib", so keep it
+            for data sent to the web client; "lz4" encodes several times faster.
+        compression_level: 1 (fastest) to 9 (smallest). Level 1 is far cheaper to
+            encode than the default for only a slightly larger payload.
+
+    Returns:
+        The VTI data as bytes
+    """
+    writer = _create_vti_writer(vtk_image, compressor, compression_level)
     writer.WriteToOutputStringOn()
     writer.Update()
 
-    vti_data = writer.GetOutputString()
+    # GetBinaryOutputString hands back bytes without a str round trip
+    if hasattr(writer, "GetBinaryOutputString"):
+        vti_data = writer.GetBinaryOutputString()
+    else:
+        vti_data = writer.GetOutputString()
 
-    # Convert to bytes if it's a string
+    # Older wrappings return the output as str
     if isinstance(vti_data, str):
         vti_data = vti_data.encode("utf-8")
 
     return vti_data
+
+
+def write_vtk_image_to_vti_file(
+    vtk_image: vtk.vtkImageData,
+    file_path: str | Path,
+    compressor: Literal["zlib", "lz4", "none"] = "zlib",
+    compression_level: int = 1,
+) -> None:
+    """
+    Write VTK image data to a VTI file
+
+    Unlike `write_vtk_image_to_vti`, the compressed data is streamed to disk
+    instead of being buffered in memory and then copied into Python bytes.
+
+    Args:
+        vtk_image: The VTK image data to write
+        file_path: Destination path
+        compressor: See `write_vtk_image_to_vti`
+        compression_level: See `write_vtk_image_to_vti`
+    """
+    writer = _create_vti_writer(vtk_image, compressor, compression_level)
+    writer.SetFileName(str(file_path))
+    if not writer.Write():
+        raise OSError(f"Failed to write VTI file: {file_path}")
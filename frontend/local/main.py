@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -32,32 +33,43 @@ ct_actors = []
 
 def window_callback(obj, event):
     """Callback for window width slider"""
-    global window_width, window_level, ct_actors
+    global window_width, ct_actors
     slider = obj.GetRepresentation()
     window_width = slider.GetValue()
 
-    # Update all CT actors
+    # Update all CT actors; vtkSliderWidget renders after InteractionEvent
     for actor in ct_actors:
         actor.GetProperty().SetColorWindow(window_width)
-        actor.GetProperty().SetColorLevel(window_level)
-
-    # Render the scene
-    obj.GetInteractor().GetRenderWindow().Render()
 
 
 def level_callback(obj, event):
     """Callback for window level slider"""
-    global window_width, window_level, ct_actors
+    global window_level, ct_actors
     slider = obj.GetRepresentation()
     window_level = slider.GetValue()
 
-    # Update all CT actors
+    # Update all CT actors; vtkSliderWidget renders after InteractionEvent
     for actor in ct_actors:
-        actor.GetProperty().SetColorWindow(window_width)
         actor.GetProperty().SetColorLevel(window_level)
 
-    # Render the scene
-    obj.GetInteractor().GetRenderWindow().Render()
+
+def load_xa(series_no):
+    """Read an XA series and convert it to a VTK image (safe to run off the main thread)"""
+    dcm_handler = BaseDicomHandler(XA_DIR_PATH / f"{series_no:03d}.dcm")
+    carm = CArm(
+        dcm_handler.positioner_primary_angle,
+        dcm_handler.positioner_secondary_angle,
+        dcm_handler.distance_source_to_detector,
+        dcm_handler.distance_source_to_patient,
+        dcm_handler.imager_pixel_spacing,
+        dcm_handler.rows,
+        dcm_handler.columns,
+        np.array([0, 0, 0]),
+        # dcm_handler.table_top_position,
+    )
+    carm = CArmLPSAdapter(carm)
+    # Create VTK image
+    return VtkImageCreator.create_xa_image(dcm_handler, carm)
 
 
 def main():
@@ -91,7 +103,7 @@ def main():
 
     # Add centerline
     ct_label = SlicerMarkupsMrkJson(CT_LABEL_PATH)
-    ct_centerline = ct_label.control_points
+    ct_centerline = ct_label.get_control_points(with_orientation=False)
 
     renderer.add_centerline(
         points=ct_centerline,
@@ -100,23 +112,12 @@ def main():
     )
 
     # XA
-    for series_no in XA_SERIES_NO_LIST:
-        ct_handler = BaseDicomHandler(XA_DIR_PATH / f"{series_no:03d}.dcm")
-        carm = CArm(
-            ct_handler.positioner_primary_angle,
-            ct_handler.positioner_secondary_angle,
-            ct_handler.distance_source_to_detector,
-            ct_handler.distance_source_to_patient,
-            ct_handler.imager_pixel_spacing,
-            ct_handler.rows,
-            ct_handler.columns,
-            np.array([0, 0, 0]),
-            # dcm_handler.table_top_position,
-        )
-        carm = CArmLPSAdapter(carm)
-        # Create VTK image
-        image_data = VtkImageCreator.create_xa_image(ct_handler, carm)
+    # Disk I/O and numpy/VTK conversion release the GIL, so load series in parallel
+    with ThreadPoolExecutor(max_workers=len(XA_SERIES_NO_LIST)) as executor:
+        xa_images = list(executor.map(load_xa, XA_SERIES_NO_LIST))
 
+    # The renderer is not thread-safe, so add images on the main thread
+    for image_data in xa_images:
         # Position XA images further away to avoid overlap with CT slices
         renderer.add_image(image_data)
 
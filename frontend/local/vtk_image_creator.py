@@ -1,17 +1,20 @@
 from app.core.carm import CArmLPSAdapter
 from app.core.dicom import BaseDicomHandler, VolumeDicomHandler
 from app.core.vtk_utils import (
+    create_multi_slice_image_mapper,
     create_vtk_image_from_multiframe,
     create_vtk_image_from_volume,
 )
-from vtk_visualization import create_multi_slice_image_mapper
 
 
 class VtkImageCreator:
     @staticmethod
-    def create_ct_image(ct_handler: VolumeDicomHandler):
-        """Create a VTK image from DICOM data"""
-        return create_vtk_image_from_volume(ct_handler)
+    def create_ct_image(ct_handler: VolumeDicomHandler, window=None):
+        """Create a VTK image from DICOM data
+
+        Pass `window=(window_width, window_center)` to store it pre-windowed as 8-bit.
+        """
+        return create_vtk_image_from_volume(ct_handler, window=window)
 
     @staticmethod
     def create_xa_image(dcm_handler: BaseDicomHandler, carm: CArmLPSAdapter):
@@ -1,4 +1,6 @@
+import numpy as np
 import vtk
+from vtkmodules.util import numpy_support
 
 
 class VtkRenderer:
@@ -7,13 +9,28 @@ class VtkRenderer:
         self.renderer = vtk.vtkRenderer()
         self.renderer.SetBackground(*background_color)
 
-        self.render_window = vtk.vtkRenderWindow()
-        self.render_window.AddRenderer(self.renderer)
-        self.render_window.SetSize(*self.window_size)
-
-        self.interactor = vtk.vtkRenderWindowInteractor()
-        self.interactor.SetRenderWindow(self.render_window)
-        self.interactor.SetInteractorStyle(vtk.vtkInteractorStyleTrackballCamera())
+        # The window and interactor are created on first use, so scenes can be
+        # built and data loaded without a window system / GL round trip
+        self._render_window = None
+        self._interactor = None
+
+    @property
+    def render_window(self):
+        """The render window, created on first access"""
+        if self._render_window is None:
+            self._render_window = vtk.vtkRenderWindow()
+            self._render_window.AddRenderer(self.renderer)
+            self._render_window.SetSize(*self.window_size)
+        return self._render_window
+
+    @property
+    def interactor(self):
+        """The render window interactor, created on first access"""
+        if self._interactor is None:
+            self._interactor = vtk.vtkRenderWindowInteractor()
+            self._interactor.SetRenderWindow(self.render_window)
+            self._interactor.SetInteractorStyle(vtk.vtkInteractorStyleTrackballCamera())
+        return self._interactor
 
     def add_image(self, image_data):
         """Add a VTK image to the renderer"""
@@ -39,7 +56,9 @@ class VtkRenderer:
         self.renderer.AddActor(axes)
         return axes
 
-    def add_centerline(self, points, tube_radius=0.5, color=(1.0, 0.0, 0.0)):
+    def add_centerline(
+        self, points, tube_radius=0.5, color=(1.0, 0.0, 0.0), num_sides=8
+    ):
         """
         Add a centerline visualization as a tube filter to the renderer
 
@@ -47,24 +66,31 @@ class VtkRenderer:
             points: Numpy array of shape (n, 3) containing the centerline points
             tube_radius: Radius of the tube filter
             color: RGB color tuple (values between 0 and 1)
+            num_sides: Number of sides of the tube. The triangle count grows
+                linearly with it; 6-8 looks round for thin tubes, use more
+                when zooming in closely
 
         Returns:
             The tube actor that was added to the renderer
         """
-        # Create a vtkPoints object and add the points
+        # Create a vtkPoints object from the points in one copy
+        # (np.array also gives a writable buffer for read-only inputs)
+        points = np.array(points, dtype=np.float64, order="C")
+        n_points = len(points)
         vtk_points = vtk.vtkPoints()
-        for point in points:
-            vtk_points.InsertNextPoint(point[0], point[1], point[2])
-
-        # Create a polyline from the points
-        polyline = vtk.vtkPolyLine()
-        polyline.GetPointIds().SetNumberOfIds(len(points))
-        for i in range(len(points)):
-            polyline.GetPointIds().SetId(i, i)
-
-        # Create a cell array to store the polyline
+        vtk_points.SetData(
+            numpy_support.numpy_to_vtk(points, deep=True, array_type=vtk.VTK_DOUBLE)
+        )
+
+        # Create a cell array holding a single polyline through all points
+        id_type = numpy_support.get_numpy_array_type(vtk.VTK_ID_TYPE)
+        offsets = np.array([0, n_points], dtype=id_type)
+        connectivity = np.arange(n_points, dtype=id_type)
         cells = vtk.vtkCellArray()
-        cells.InsertNextCell(polyline)
+        cells.SetData(
+            numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=True),
+            numpy_support.numpy_to_vtkIdTypeArray(connectivity, deep=True),
+        )
 
         # Create a polydata to store the points and lines
         polydata = vtk.vtkPolyData()
@@ -75,7 +101,7 @@ class VtkRenderer:
         tube_filter = vtk.vtkTubeFilter()
         tube_filter.SetInputData(polydata)
         tube_filter.SetRadius(tube_radius)
-        tube_filter.SetNumberOfSides(16)
+        tube_filter.SetNumberOfSides(num_sides)
         tube_filter.CappingOn()
         tube_filter.Update()
 
@@ -94,11 +120,11 @@ class VtkRenderer:
 
     def set_camera(self, position, focal_point, view_up):
         """Set the camera to the renderer"""
-        camera = vtk.vtkCamera()
+        # Update the active camera in place rather than swapping in a new one
+        camera = self.renderer.GetActiveCamera()
         camera.SetPosition(position)
         camera.SetFocalPoint(focal_point)
         camera.SetViewUp(view_up)
-        self.renderer.SetActiveCamera(camera)
 
     def reset_camera(self):
         """Reset the camera to view all objects"""